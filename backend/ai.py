@@ -16,9 +16,20 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class AIService:
-    def __init__(self):
+    def __init__(self, usage_ledger=None):
+        self.usage_ledger = usage_ledger
+        self.init_clients()
+
+    def init_clients(self):
+        """(Re)create the Bedrock clients; called again in each worker after fork"""
         try:
-            boto_config = BotoConfig(read_timeout=600)
+            boto_config = BotoConfig(
+                connect_timeout=ConfigAI.BEDROCK_CONNECT_TIMEOUT,
+                read_timeout=ConfigAI.BEDROCK_READ_TIMEOUT,
+                # Retries are done in _process_ai_response so they stay within the time budget
+                retries={'mode': 'standard', 'total_max_attempts': 1},
+                max_pool_connections=ConfigAI.BEDROCK_MAX_POOL_CONNECTIONS
+            )
             self.bedrock_client = boto3.client(
                 'bedrock-runtime',
                 aws_access_key_id=ConfigAI.AWS_ACCESS_KEY_ID,
@@ -40,14 +51,14 @@ class AIService:
             logger.error(f"Failed to initialize AI Service: {e}")
             raise
     
-    def generate_sow_document(self, user_prompt) -> dict:
+    def generate_sow_document(self, user_prompt, user_id=None) -> dict:
         try:
-            return self._generate_sow_structure({'projectDescription': user_prompt})
+            return self._generate_sow_structure({'projectDescription': user_prompt}, user_id=user_id)
         except Exception as e:
             logger.error(f"Error generating: {e}")
             raise
     
-    def _generate_sow_structure(self, sow_fields) -> dict:
+    def _generate_sow_structure(self, sow_fields, user_id=None) -> dict:
         if isinstance(sow_fields, dict):
             prompt_lines = []
             if sow_fields.get('clientName'):
@@ -80,7 +91,7 @@ class AIService:
             SystemMessage(content=system_prompt),
             HumanMessage(content=f"Create a professional Statement of Work for: {structured_prompt}")
         ]
-        return self._process_ai_response(messages)
+        return self._process_ai_response(messages, user_id=user_id)
 
 
     
@@ -265,13 +276,25 @@ class AIService:
         
         return complete_prompt
 
-    def _process_ai_response(self, messages) -> dict:
+    def _process_ai_response(self, messages, user_id=None) -> dict:
         max_retries = 5
         backoff = 4
         last_exception = None
+        deadline = time.monotonic() + ConfigAI.BEDROCK_GENERATION_TIMEOUT
         for attempt in range(1, max_retries + 1):
             try:
-                response = self.llm.invoke(messages)
+                reservation = None
+                if self.usage_ledger:
+                    reservation = self.usage_ledger.reserve(user_id, ConfigAI.BEDROCK_MODEL_ID)
+                started = time.monotonic()
+                try:
+                    response = self.llm.invoke(messages)
+                except Exception:
+                    # Throttled or failed calls must not use up the user's quota
+                    if reservation:
+                        self.usage_ledger.release(reservation)
+                    raise
+                self._record_usage(user_id, response, (time.monotonic() - started) * 1000)
                 content = response.content.strip()
                 try:
                     parsed_content = self._extract_json_from_response(content)
@@ -306,6 +329,9 @@ class AIService:
                     logger.error("Max retries reached. Raising error.")
                     break
                 sleep_time = backoff ** attempt + random.uniform(0, 1)
+                if not self._retry_fits(deadline, sleep_time):
+                    logger.error("Generation time budget exhausted. Raising error.")
+                    break
                 logger.info(f"Retrying in {sleep_time:.2f} seconds...")
                 time.sleep(sleep_time)
             except ClientError as e:
@@ -317,6 +343,9 @@ class AIService:
                         logger.error("Max retries reached. Raising error.")
                         break
                     sleep_time = backoff ** attempt + random.uniform(0, 1)
+                    if not self._retry_fits(deadline, sleep_time):
+                        logger.error("Generation time budget exhausted. Raising error.")
+                        break
                     logger.info(f"Retrying in {sleep_time:.2f} seconds...")
                     time.sleep(sleep_time)
                 else:
@@ -334,6 +363,9 @@ class AIService:
                         logger.error("Max retries reached. Raising error.")
                         break
                     sleep_time = backoff ** attempt + random.uniform(0, 1)
+                    if not self._retry_fits(deadline, sleep_time):
+                        logger.error("Generation time budget exhausted. Raising error.")
+                        break
                     logger.info(f"Retrying in {sleep_time:.2f} seconds...")
                     time.sleep(sleep_time)
                 else:
@@ -342,6 +374,25 @@ class AIService:
             raise last_exception
         raise RuntimeError("Unknown error in _process_ai_response: no response and no exception captured.")
 
+    @staticmethod
+    def _retry_fits(deadline, sleep_time) -> bool:
+        # Only retry if the backoff plus a full Bedrock attempt still ends before the
+        # deadline, so a generation never outlives the server's graceful timeout
+        attempt_timeout = ConfigAI.BEDROCK_CONNECT_TIMEOUT + ConfigAI.BEDROCK_READ_TIMEOUT
+        return time.monotonic() + sleep_time + attempt_timeout <= deadline
+
+    def _record_usage(self, user_id, response, latency_ms):
+        if not self.usage_ledger:
+            return
+        usage = getattr(response, 'usage_metadata', None) or {}
+        self.usage_ledger.record(
+            user_id,
+            ConfigAI.BEDROCK_MODEL_ID,
+            usage.get('input_tokens', 0),
+            usage.get('output_tokens', 0),
+            latency_ms
+        )
+
     @staticmethod
     def _extract_json_from_response(content: str) -> dict:
         content = content.strip()
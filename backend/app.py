@@ -8,14 +8,24 @@ from db import mongo_db
 from models import User, Sow
 from bson import ObjectId
 from config import ConfigAI
+from usage import UsageLedger, QuotaExceededError, MAX_REPORT_HOURS
 
 app = Flask(__name__)
 CORS(app)
-ai = AIService()
+usage_ledger = UsageLedger(mongo_db)
+ai = AIService(usage_ledger=usage_ledger)
 
 @app.route('/api/generate-document', methods=['POST'])
 def generate_presentation():
     raw_llm_output = None
+    token = request.headers.get('Authorization')
+    if not token:
+        return jsonify({'error': 'Authorization token missing'}), 401
+
+    user = get_user_from_token(token.split(' ')[1])
+    if not user:
+        return jsonify({'error': 'Not authenticated or user not found'}), 401
+
     try:
         if not request.is_json:
             return jsonify({'error': 'Content-Type must be JSON'}), 400
@@ -40,7 +50,12 @@ def generate_presentation():
 
         if any(sow_fields.values()):
             try:
-                presentation_data = ai.generate_sow_document(sow_fields)
+                presentation_data = ai.generate_sow_document(sow_fields, user_id=str(user['_id']))
+            except QuotaExceededError as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 429
             except json.JSONDecodeError as e:
                 if hasattr(e, 'doc'):
                     raw_llm_output = e.doc
@@ -227,5 +242,33 @@ def delete_sow(sow_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
+@app.route('/api/usage', methods=['GET'])
+def get_usage():
+    token = request.headers.get('Authorization')
+    if not token:
+        return jsonify({'error': 'Authorization token missing'}), 401
+    
+    user = get_user_from_token(token.split(' ')[1])
+    if not user:
+        return jsonify({'error': 'Not authenticated or user not found'}), 401
+
+    hours = request.args.get('hours')
+    if hours is not None:
+        if not hours.isdigit() or not 1 <= int(hours) <= MAX_REPORT_HOURS:
+            return jsonify({'error': f'hours must be a whole number between 1 and {MAX_REPORT_HOURS}'}), 400
+        hours = int(hours)
+
+    try:
+        report = usage_ledger.report(user_id=str(user['_id']), hours=hours)
+        report['quota'] = {
+            'requests': ConfigAI.USAGE_USER_REQUEST_QUOTA or None,
+            'totalTokens': ConfigAI.USAGE_USER_TOKEN_QUOTA or None,
+            'windowHours': ConfigAI.USAGE_QUOTA_WINDOW_HOURS,
+        }
+        return jsonify(report), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    # Development server only; production runs under gunicorn (see gunicorn.conf.py)
+    app.run(debug=ConfigAI.DEBUG)
\ No newline at end of file
@@ -0,0 +1,137 @@
+"""Measure how request throughput scales with the number of gunicorn workers.
+
+Starts the production profile (gunicorn.conf.py) once per worker count, fires a
+fixed number of concurrent requests at one endpoint and prints a table of
+requests/second and latency percentiles.
+
+    python benchmark.py --workers 1 2 4 8 --requests 2000 --concurrency 64
+
+The default target is the SOW listing, which exercises Flask, JWT decoding
+and the Mongo pool without spending Bedrock tokens. Authenticated endpoints
+need a JWT, e.g. from /api/login, in BENCH_TOKEN; pass --no-auth for public
+paths. Any failed request aborts the run.
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+
+def wait_for_port(server, host, port, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with code {server.returncode} before listening")
+        try:
+            with socket.create_connection((host, port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise TimeoutError(f"Server did not start listening on {host}:{port}")
+
+
+def start_server(workers, threads, host, port):
+    command = [
+        sys.executable, '-m', 'gunicorn',
+        '-c', 'gunicorn.conf.py',
+        '--workers', str(workers),
+        '--threads', str(threads),
+        '--bind', f'{host}:{port}',
+        '--access-logfile', '/dev/null',
+        'app:app',
+    ]
+    server = subprocess.Popen(command, cwd=os.path.dirname(os.path.abspath(__file__)))
+    try:
+        wait_for_port(server, host, port)
+    except Exception:
+        server.kill()
+        server.wait()
+        raise
+    return server
+
+
+def stop_server(server):
+    server.send_signal(signal.SIGTERM)
+    try:
+        server.wait(timeout=60)
+    except subprocess.TimeoutExpired:
+        server.kill()
+
+
+def run_load(url, method, token, total_requests, concurrency, warmup):
+    local = threading.local()
+    headers = {'Authorization': f'Bearer {token}'} if token else {}
+
+    def send(_):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        started = time.perf_counter()
+        response = session.request(method, url, headers=headers)
+        return time.perf_counter() - started, response.status_code
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(send, range(warmup)))
+        started = time.perf_counter()
+        results = list(pool.map(send, range(total_requests)))
+        elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for latency, _ in results)
+    errors = sum(1 for _, status in results if status >= 400)
+    return {
+        'throughput': total_requests / elapsed,
+        'p50': statistics.median(latencies) * 1000,
+        'p95': latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        'errors': errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    cpu_count = multiprocessing.cpu_count()
+    default_workers = sorted({1, 2, 4, cpu_count} & set(range(1, cpu_count + 1)))
+    parser.add_argument('--workers', type=int, nargs='+', default=default_workers)
+    parser.add_argument('--threads', type=int, default=int(os.getenv('GUNICORN_THREADS', 8)))
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--warmup', type=int, default=50)
+    parser.add_argument('--path', default='/api/sows')
+    parser.add_argument('--method', default='GET')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--no-auth', action='store_true', help='target is public, do not require BENCH_TOKEN')
+    args = parser.parse_args()
+
+    token = os.getenv('BENCH_TOKEN')
+    if not token and not args.no_auth:
+        parser.error(f"BENCH_TOKEN is not set; {args.path} would only measure 401 responses (pass --no-auth for public paths)")
+    url = f'http://{args.host}:{args.port}{args.path}'
+    print(f"{args.method} {url}, {args.requests} requests, concurrency {args.concurrency}, {args.threads} threads/worker")
+    print(f"{'workers':>8} {'req/s':>10} {'speedup':>8} {'p50 ms':>9} {'p95 ms':>9}")
+
+    baseline = None
+    for workers in args.workers:
+        server = start_server(workers, args.threads, args.host, args.port)
+        try:
+            result = run_load(url, args.method, token, args.requests, args.concurrency, args.warmup)
+        finally:
+            stop_server(server)
+        if result['errors']:
+            sys.exit(f"{workers} workers: {result['errors']}/{args.requests} requests failed, throughput not comparable")
+        baseline = baseline or result['throughput']
+        print(
+            f"{workers:>8} {result['throughput']:>10.1f} {result['throughput'] / baseline:>7.2f}x "
+            f"{result['p50']:>9.1f} {result['p95']:>9.1f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -9,7 +9,20 @@ class ConfigAI:
     AWS_REGION = os.getenv('AWS_REGION')
     BEDROCK_MODEL_ID = os.getenv('BEDROCK_MODEL_ID')
 
-    DEBUG = os.getenv('FLASK_DEBUG', 'True').lower() == 'true'
+    DEBUG = os.getenv('FLASK_DEBUG', 'False').lower() == 'true'
     CORS_ORIGINS = os.getenv('CORS_ORIGINS')
     BEDROCK_TIMEOUT = int(os.getenv('BEDROCK_TIMEOUT', 60))
+    BEDROCK_MAX_POOL_CONNECTIONS = int(os.getenv('BEDROCK_MAX_POOL_CONNECTIONS', 10))
+    BEDROCK_CONNECT_TIMEOUT = int(os.getenv('BEDROCK_CONNECT_TIMEOUT', 10))
+    BEDROCK_READ_TIMEOUT = int(os.getenv('BEDROCK_READ_TIMEOUT', 600))
+    # Upper bound for one generation including retries; a retry only starts if a
+    # full attempt still fits, so keep this above connect + read timeout
+    BEDROCK_GENERATION_TIMEOUT = int(os.getenv('BEDROCK_GENERATION_TIMEOUT', 840))
+
+    # Rolling usage quotas, 0 disables a limit
+    USAGE_QUOTA_WINDOW_HOURS = int(os.getenv('USAGE_QUOTA_WINDOW_HOURS', 24))
+    USAGE_USER_REQUEST_QUOTA = int(os.getenv('USAGE_USER_REQUEST_QUOTA', 0))
+    USAGE_USER_TOKEN_QUOTA = int(os.getenv('USAGE_USER_TOKEN_QUOTA', 0))
+    USAGE_GLOBAL_REQUEST_QUOTA = int(os.getenv('USAGE_GLOBAL_REQUEST_QUOTA', 0))
+    USAGE_GLOBAL_TOKEN_QUOTA = int(os.getenv('USAGE_GLOBAL_TOKEN_QUOTA', 0))
     
\ No newline at end of file
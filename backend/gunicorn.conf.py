@@ -0,0 +1,76 @@
+import multiprocessing
+import os
+import threading
+from dotenv import load_dotenv
+from config import ConfigAI
+
+load_dotenv()
+
+# Production server profile: gunicorn -c gunicorn.conf.py app:app
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+
+# Pre-fork workers, one process per core by default. Generations are
+# dominated by waiting on Bedrock, so each worker also runs a thread pool.
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count()))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", 8))
+
+# A generation, retries included, is bounded by BEDROCK_GENERATION_TIMEOUT
+# (840s by default), see AIService._process_ai_response. gthread workers
+# heartbeat from their main loop, but keep the timeout above that bound so a
+# stuck worker is never confused with a long generation.
+timeout = int(os.getenv("GUNICORN_TIMEOUT", ConfigAI.BEDROCK_GENERATION_TIMEOUT + 60))
+# On SIGTERM/SIGHUP workers stop accepting and get this long to drain
+# in-flight generations before they are killed.
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", ConfigAI.BEDROCK_GENERATION_TIMEOUT + 60))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 5))
+
+# Recycle workers now and then to bound memory growth
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 100))
+
+# Import the app once in the master; clients are recreated in post_fork
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-")
+errorlog = os.getenv("GUNICORN_ERROR_LOG", "-")
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+
+GENERATION_PATH = "/api/generate-document"
+
+
+def post_fork(server, worker):
+    # Neither MongoClient nor boto3 clients survive fork, so give each worker its own
+    from db import mongo_db
+    import app
+
+    mongo_db.close()
+    # Build the worker's own pool before any request threads can race for it
+    mongo_db.connect()
+    app.ai.init_clients()
+
+    worker.in_flight_generations = 0
+    worker.in_flight_lock = threading.Lock()
+    server.log.info(f"Worker {worker.pid} initialized Mongo and Bedrock clients")
+
+
+def pre_request(worker, req):
+    if req.path == GENERATION_PATH:
+        with worker.in_flight_lock:
+            worker.in_flight_generations += 1
+
+
+def post_request(worker, req, environ, resp):
+    if req.path == GENERATION_PATH:
+        with worker.in_flight_lock:
+            worker.in_flight_generations -= 1
+
+
+def worker_exit(server, worker):
+    from db import mongo_db
+
+    remaining = getattr(worker, "in_flight_generations", 0)
+    if remaining:
+        server.log.warning(f"Worker {worker.pid} exited with {remaining} generations still in flight")
+    mongo_db.close()
@@ -0,0 +1,147 @@
+import copy
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import ConfigAI
+from usage import UsageLedger, QuotaExceededError, USER_SCOPE, GLOBAL_SCOPE
+
+
+def _matches(doc, query):
+    for field, condition in query.items():
+        if field == '$or':
+            if not any(_matches(doc, sub) for sub in condition):
+                return False
+        elif field == '$nor':
+            if any(_matches(doc, sub) for sub in condition):
+                return False
+        elif isinstance(condition, dict) and '$gte' in condition:
+            if doc.get(field) is None or doc[field] < condition['$gte']:
+                return False
+        elif doc.get(field) != condition:
+            return False
+    return True
+
+
+class FakeCollection:
+    """The subset of pymongo's Collection that UsageLedger uses, kept in memory"""
+
+    def __init__(self):
+        self.docs = []
+        self.fail_find_one_and_update_on = None
+
+    def create_index(self, *args, **kwargs):
+        pass
+
+    def find(self, query, projection=None):
+        return [copy.deepcopy(doc) for doc in self.docs if _matches(doc, query)]
+
+    def _update(self, key, update, upsert):
+        doc = next((doc for doc in self.docs if _matches(doc, key)), None)
+        if doc is None:
+            if not upsert:
+                return None
+            doc = dict(key)
+            self.docs.append(doc)
+        for field, amount in update.get('$inc', {}).items():
+            doc[field] = doc.get(field, 0) + amount
+        for field, value in update.get('$max', {}).items():
+            doc[field] = max(doc.get(field, value), value)
+        return doc
+
+    def find_one_and_update(self, key, update, projection=None, upsert=False, return_document=None):
+        if self.fail_find_one_and_update_on == key['scope']:
+            raise ConnectionError("connection reset")
+        return copy.deepcopy(self._update(key, update, upsert))
+
+    def bulk_write(self, operations, ordered=True):
+        for op in operations:
+            self._update(op._filter, op._doc, op._upsert)
+
+    def requests(self, scope):
+        return sum(doc.get('requests', 0) for doc in self.docs if doc['scope'] == scope)
+
+
+class FakeMongoDB:
+    def __init__(self):
+        self.collection = FakeCollection()
+
+    def get_collection(self, collection_name):
+        return self.collection
+
+
+class UsageLedgerReserveTest(unittest.TestCase):
+    def setUp(self):
+        self.saved_limits = {
+            name: getattr(ConfigAI, name)
+            for name in ('USAGE_USER_REQUEST_QUOTA', 'USAGE_USER_TOKEN_QUOTA',
+                         'USAGE_GLOBAL_REQUEST_QUOTA', 'USAGE_GLOBAL_TOKEN_QUOTA')
+        }
+        for name in self.saved_limits:
+            setattr(ConfigAI, name, 0)
+        self.mongo_db = FakeMongoDB()
+        self.collection = self.mongo_db.collection
+        self.ledger = UsageLedger(self.mongo_db)
+
+    def tearDown(self):
+        for name, value in self.saved_limits.items():
+            setattr(ConfigAI, name, value)
+
+    def test_user_request_quota_rejects_and_rolls_back(self):
+        ConfigAI.USAGE_USER_REQUEST_QUOTA = 2
+        self.ledger.reserve('alice', 'model')
+        self.ledger.reserve('alice', 'model')
+
+        with self.assertRaises(QuotaExceededError) as raised:
+            self.ledger.reserve('alice', 'model')
+
+        self.assertEqual(raised.exception.scope, USER_SCOPE)
+        self.assertEqual(self.collection.requests(USER_SCOPE), 2)
+        self.assertEqual(self.collection.requests(GLOBAL_SCOPE), 2)
+        self.ledger.reserve('bob', 'model')
+
+    def test_global_token_quota_rolls_back_user_reservation(self):
+        ConfigAI.USAGE_GLOBAL_TOKEN_QUOTA = 1000
+        keys = self.ledger.reserve('alice', 'model')
+        self.assertEqual(len(keys), 2)
+        self.ledger.record('alice', 'model', 400, 600, 120)
+
+        with self.assertRaises(QuotaExceededError) as raised:
+            self.ledger.reserve('bob', 'model')
+
+        self.assertEqual(raised.exception.scope, GLOBAL_SCOPE)
+        self.assertEqual(raised.exception.used, 1000)
+        self.assertEqual(self.collection.requests(USER_SCOPE), 1)
+        self.assertEqual(self.collection.requests(GLOBAL_SCOPE), 1)
+
+    def test_error_during_reservation_releases_user_scope(self):
+        ConfigAI.USAGE_USER_REQUEST_QUOTA = 5
+        self.collection.fail_find_one_and_update_on = GLOBAL_SCOPE
+
+        with self.assertRaises(ConnectionError):
+            self.ledger.reserve('alice', 'model')
+
+        self.assertEqual(self.collection.requests(USER_SCOPE), 0)
+
+    def test_released_reservation_does_not_count_against_quota(self):
+        ConfigAI.USAGE_USER_REQUEST_QUOTA = 1
+        for _ in range(3):
+            # e.g. a throttled Bedrock call that never returned a response
+            self.ledger.release(self.ledger.reserve('alice', 'model'))
+
+        self.ledger.reserve('alice', 'model')
+        self.assertEqual(self.collection.requests(USER_SCOPE), 1)
+
+
+class UsageLedgerReportTest(unittest.TestCase):
+    def test_rejects_out_of_range_hours(self):
+        ledger = UsageLedger(FakeMongoDB())
+        for hours in (-5, 10 ** 9):
+            with self.assertRaises(ValueError):
+                ledger.report('alice', hours=hours)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,253 @@
+import datetime
+import logging
+from pymongo import ASCENDING, ReturnDocument, UpdateOne
+from config import ConfigAI
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_SCOPE = 'global'
+USER_SCOPE = 'user'
+MAX_REPORT_HOURS = 24 * 90
+
+
+class QuotaExceededError(Exception):
+    """Raised when a user or the whole service has used up its rolling quota"""
+
+    def __init__(self, scope, limit_name, used, limit):
+        self.scope = scope
+        self.limit_name = limit_name
+        self.used = used
+        self.limit = limit
+        super().__init__(
+            f"{scope.capitalize()} {limit_name} quota exceeded: {used}/{limit} "
+            f"in the last {ConfigAI.USAGE_QUOTA_WINDOW_HOURS} hours"
+        )
+
+
+class UsageLedger:
+    """Records LLM usage into pre-aggregated hourly buckets and enforces rolling quotas.
+
+    Each bucket document is keyed by scope, userId, model and the start of the hour.
+    A Bedrock request is reserved before it is sent by atomically `$inc`-ing the
+    `requests` counter of the current user and global buckets, and its token counts
+    and latency are added with a single bulk upsert once the response arrives.
+    """
+
+    def __init__(self, mongo_db, collection_name='usage_buckets'):
+        self.mongo_db = mongo_db
+        self.collection_name = collection_name
+        self._index_ready = False
+
+    @property
+    def collection(self):
+        # Resolved per call so a forked worker uses its own MongoClient
+        return self.mongo_db.get_collection(self.collection_name)
+
+    def _ensure_index(self):
+        # Created on first use rather than at import, so loading the app never touches the network
+        if self._index_ready:
+            return
+        try:
+            self.collection.create_index(
+                [('scope', ASCENDING), ('userId', ASCENDING), ('bucket', ASCENDING), ('model', ASCENDING)],
+                unique=True,
+                name='usage_bucket_key'
+            )
+            self._index_ready = True
+        except Exception as e:
+            logger.warning(f"Could not ensure usage ledger index: {e}")
+
+    @staticmethod
+    def _bucket_start(moment):
+        return moment.replace(minute=0, second=0, microsecond=0)
+
+    @staticmethod
+    def _window_start(hours):
+        now = datetime.datetime.now(datetime.timezone.utc)
+        return UsageLedger._bucket_start(now) - datetime.timedelta(hours=hours - 1)
+
+    @staticmethod
+    def _bucket_key(scope, user_id, bucket, model):
+        return {
+            'scope': scope,
+            'userId': str(user_id) if scope == USER_SCOPE else None,
+            'bucket': bucket,
+            'model': model,
+        }
+
+    @staticmethod
+    def _limits():
+        return {
+            USER_SCOPE: {
+                'requests': ConfigAI.USAGE_USER_REQUEST_QUOTA,
+                'totalTokens': ConfigAI.USAGE_USER_TOKEN_QUOTA,
+            },
+            GLOBAL_SCOPE: {
+                'requests': ConfigAI.USAGE_GLOBAL_REQUEST_QUOTA,
+                'totalTokens': ConfigAI.USAGE_GLOBAL_TOKEN_QUOTA,
+            },
+        }
+
+    def _window_totals(self, user_id, hours, exclude_bucket, exclude_model):
+        """Sum the window for the user and global scopes, leaving out the bucket being reserved"""
+        query = {
+            'bucket': {'$gte': self._window_start(hours)},
+            '$nor': [{'bucket': exclude_bucket, 'model': exclude_model}],
+        }
+        scopes = [{'scope': GLOBAL_SCOPE}]
+        if user_id:
+            scopes.append({'scope': USER_SCOPE, 'userId': str(user_id)})
+        query['$or'] = scopes
+
+        totals = {
+            USER_SCOPE: {'requests': 0, 'totalTokens': 0},
+            GLOBAL_SCOPE: {'requests': 0, 'totalTokens': 0},
+        }
+        projection = {'scope': 1, 'requests': 1, 'totalTokens': 1, '_id': 0}
+        for doc in self.collection.find(query, projection):
+            scope_totals = totals[doc['scope']]
+            scope_totals['requests'] += doc.get('requests', 0)
+            scope_totals['totalTokens'] += doc.get('totalTokens', 0)
+        return totals
+
+    def reserve(self, user_id, model):
+        """Count one Bedrock request against the user and global quotas before it is sent.
+
+        The counters are incremented atomically and the post-increment values are
+        compared with the limits, so concurrent requests cannot all slip through.
+        A rejected reservation is rolled back and QuotaExceededError is raised.
+        Returns the reserved bucket keys, to be passed to `release` if the
+        request fails before Bedrock returns a response.
+        """
+        self._ensure_index()
+        bucket = self._bucket_start(datetime.datetime.now(datetime.timezone.utc))
+        scopes = [USER_SCOPE, GLOBAL_SCOPE] if user_id else [GLOBAL_SCOPE]
+        limits = self._limits()
+
+        keys = [self._bucket_key(scope, user_id, bucket, model) for scope in scopes]
+
+        if not any(limit for scope in scopes for limit in limits[scope].values()):
+            try:
+                self.collection.bulk_write(
+                    [UpdateOne(key, {'$inc': {'requests': 1}}, upsert=True) for key in keys],
+                    ordered=False
+                )
+            except Exception as e:
+                # Nothing to enforce, so a ledger outage must not block generation
+                logger.error(f"Failed to record usage reservation for user {user_id}: {e}")
+                return []
+            return keys
+
+        prior = self._window_totals(user_id, ConfigAI.USAGE_QUOTA_WINDOW_HOURS, bucket, model)
+        reserved = []
+        try:
+            for scope, key in zip(scopes, keys):
+                current = self.collection.find_one_and_update(
+                    key,
+                    {'$inc': {'requests': 1}},
+                    projection={'requests': 1, 'totalTokens': 1, '_id': 0},
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER
+                )
+                reserved.append(key)
+                used = {
+                    'requests': prior[scope]['requests'] + current.get('requests', 0),
+                    'totalTokens': prior[scope]['totalTokens'] + current.get('totalTokens', 0),
+                }
+                for field, limit_name in (('requests', 'request'), ('totalTokens', 'token')):
+                    limit = limits[scope][field]
+                    # `requests` already includes this reservation, tokens only include finished calls
+                    exceeded = used[field] > limit if field == 'requests' else used[field] >= limit
+                    if limit and exceeded:
+                        raise QuotaExceededError(scope, limit_name, used[field], limit)
+        except Exception:
+            self.release(reserved)
+            raise
+        return reserved
+
+    def release(self, keys):
+        """Give back reservations for requests that never got a response from Bedrock"""
+        if not keys:
+            return
+        try:
+            self.collection.bulk_write(
+                [UpdateOne(key, {'$inc': {'requests': -1}}) for key in keys],
+                ordered=False
+            )
+        except Exception as e:
+            logger.error(f"Failed to release usage reservation: {e}")
+
+    def record(self, user_id, model, input_tokens, output_tokens, latency_ms):
+        """Add the token counts and latency of a completed request reserved with `reserve`"""
+        self._ensure_index()
+        bucket = self._bucket_start(datetime.datetime.now(datetime.timezone.utc))
+        increments = {
+            'completions': 1,
+            'inputTokens': int(input_tokens or 0),
+            'outputTokens': int(output_tokens or 0),
+            'totalTokens': int(input_tokens or 0) + int(output_tokens or 0),
+            'latencyMs': int(latency_ms),
+        }
+        scopes = [USER_SCOPE, GLOBAL_SCOPE] if user_id else [GLOBAL_SCOPE]
+        operations = [
+            UpdateOne(
+                self._bucket_key(scope, user_id, bucket, model),
+                {'$inc': increments, '$max': {'maxLatencyMs': int(latency_ms)}},
+                upsert=True
+            )
+            for scope in scopes
+        ]
+        try:
+            self.collection.bulk_write(operations, ordered=False)
+        except Exception as e:
+            # Accounting must never fail a generation that has already been paid for
+            logger.error(f"Failed to record usage for user {user_id}: {e}")
+
+    def report(self, user_id=None, hours=None):
+        """Aggregate usage per model over the last `hours` for a user, or globally if no user is given"""
+        self._ensure_index()
+        hours = hours or ConfigAI.USAGE_QUOTA_WINDOW_HOURS
+        if not 1 <= hours <= MAX_REPORT_HOURS:
+            raise ValueError(f"hours must be between 1 and {MAX_REPORT_HOURS}")
+        match = {'bucket': {'$gte': self._window_start(hours)}}
+        if user_id:
+            match.update({'scope': USER_SCOPE, 'userId': str(user_id)})
+        else:
+            match['scope'] = GLOBAL_SCOPE
+
+        pipeline = [
+            {'$match': match},
+            {'$group': {
+                '_id': '$model',
+                'requests': {'$sum': '$requests'},
+                'completions': {'$sum': '$completions'},
+                'inputTokens': {'$sum': '$inputTokens'},
+                'outputTokens': {'$sum': '$outputTokens'},
+                'totalTokens': {'$sum': '$totalTokens'},
+                'latencyMs': {'$sum': '$latencyMs'},
+                'maxLatencyMs': {'$max': '$maxLatencyMs'},
+            }},
+            {'$sort': {'totalTokens': -1}},
+        ]
+        models = []
+        totals = {'requests': 0, 'inputTokens': 0, 'outputTokens': 0, 'totalTokens': 0}
+        for row in self.collection.aggregate(pipeline):
+            completions = row['completions'] or 0
+            models.append({
+                'model': row['_id'],
+                'requests': row['requests'],
+                'completions': completions,
+                'inputTokens': row['inputTokens'],
+                'outputTokens': row['outputTokens'],
+                'totalTokens': row['totalTokens'],
+                'avgLatencyMs': round(row['latencyMs'] / completions) if completions else 0,
+                'maxLatencyMs': row['maxLatencyMs'],
+            })
+            for key in totals:
+                totals[key] += row[key]
+
+        return {
+            'windowHours': hours,
+            'totals': totals,
+            'models': models,
+        }
@@ -223,10 +223,14 @@ export default function GenerateSOWPage() {
           .map((field) => [field, form[field].trim()])
       );
       const requestBody = { ...requiredFields, ...optionalFieldsToSend };
+      if (!token) {
+        setError('Authentication token not found. Please log in again.');
+        return;
+      }
 
       const sowResponse = await fetch(`${API_URL}/api/generate-document`, {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        headers: { 'Content-Type': 'application/json', Authorization: `Bearer ${token}` },
         body: JSON.stringify(requestBody),
       });
       const sowResult = await sowResponse.json();
@@ -248,10 +252,6 @@ export default function GenerateSOWPage() {
         return slide;
       });
       const presentationWithSOW = { ...sowDataToSave, sowNumber: generatedSowNumber, clientName: form.clientName.trim(), slides: slidesWithSOW, prompt: requestBody };
-      if (!token) {
-        setError('Authentication token not found. Please log in again.');
-        return;
-      }
       await api.sows.createSow(presentationWithSOW, token);
       navigate('/presentation', { state: { presentation: presentationWithSOW } });
     } catch (err: unknown) {